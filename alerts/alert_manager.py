@@ -1,18 +1,57 @@
 # alert_manager.py
 import os
 import time
+import asyncio
 import json
 import smtplib
 import logging
 import sqlite3
+import threading
+from bisect import bisect_left
+from collections import deque
 from email.mime.text import MIMEText
-from typing import Dict, Any, List
-from data.data_locker import DataLocker
+from enum import IntFlag
+from typing import Deque, Dict, Any, List, Optional, Tuple
+from data.data_locker import DataLocker, apply_sqlite_pragmas, connect_read_only
 from calc_services import CalcServices
 from data.hybrid_config_manager import load_config_hybrid
 
+# Level comes from the application's logging config (DEBUG under __main__ below),
+# so per-position debug calls are dropped early when nobody is listening.
 logger = logging.getLogger("AlertManagerLogger")
-logger.setLevel(logging.DEBUG)
+
+# Alert level names, indexed by the severity code from bisecting the liquid-zone
+# edges; code len(LIQUID_LEVELS) means no alert.
+LIQUID_LEVELS = ("HIGH", "MEDIUM", "LOW")
+
+
+class Channel(IntFlag):
+    EMAIL = 1
+    SMS = 2
+
+
+class TokenBucket:
+    """
+    Allows `rate` events per second on average, with bursts of up to `burst`.
+    Not thread-safe; callers serialize access.
+    """
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """
+        Takes a token and returns 0.0, or returns the seconds until one is available.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
 
 
 class AlertManagerV2:
@@ -24,21 +63,49 @@ class AlertManagerV2:
         self.poll_interval = poll_interval
         self.config_path = config_path
 
-        # Setup
-        self.data_locker = DataLocker(self.db_path)
+        # Setup: long-lived connections owned by the manager, so each poll reuses
+        # them instead of reopening the sqlite file. The single writer sets WAL mode
+        # and bootstraps config_overrides; polling goes through a read-only
+        # connection that never waits on the writer.
+        self._write_conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        apply_sqlite_pragmas(self._write_conn)
+        self._read_conn = connect_read_only(self.db_path)
+        self.data_locker = DataLocker(self.db_path, conn=self._read_conn)
         self.calc_services = CalcServices()
 
         # This returns a dict, not an object:
-        db_conn = self.data_locker.get_db_connection()
-        self.config = load_config_hybrid(self.config_path, db_conn)  # <-- returns dict
+        self.config = load_config_hybrid(self.config_path, self._write_conn)  # <-- returns dict
 
         # travel_percent_liquid_ranges:
         self.liquid_cfg = self.config["alert_ranges"]["travel_percent_liquid_ranges"]
+        # Zone edges in ascending order (high < medium < low, all negative), so a
+        # single bisect classifies a travel % against all three thresholds.
+        self._liquid_edges = (self.liquid_cfg["high"], self.liquid_cfg["medium"], self.liquid_cfg["low"])
 
         # If you have "notification_config" in the dict:
         self.email_conf = self.config["notification_config"]["email"]
         self.sms_conf = self.config["notification_config"]["sms"]
 
+        # Enabled channels as a bitmask. Optional top-level config key
+        # "alert_channels": a list of channel names, case-insensitive, from
+        # Channel (EMAIL, SMS); defaults to both. Unknown names are logged and
+        # skipped. Recipients are resolved here once rather than per alert.
+        self._channel_mask = Channel(0)
+        for name in self.config.get("alert_channels", ["EMAIL", "SMS"]):
+            channel = Channel.__members__.get(str(name).upper())
+            if channel is None:
+                logger.error("Ignoring unknown alert channel %r in alert_channels (expected one of %s)",
+                             name, ", ".join(Channel.__members__))
+                continue
+            self._channel_mask |= channel
+        self._alert_recipients: List[str] = []
+        if self._channel_mask & Channel.EMAIL:
+            self._alert_recipients.append(self.email_conf["recipient_email"])
+        if self._channel_mask & Channel.SMS:
+            self._alert_recipients.append(
+                f"{self.sms_conf['recipient_number']}@{self.sms_conf['carrier_gateway']}"
+            )
+
         # If you stored alert_cooldown_seconds in the top-level dict:
         self.cooldown = self.config.get("alert_cooldown_seconds", 900)  # 15 mins default
 
@@ -46,13 +113,74 @@ class AlertManagerV2:
         # "alert_monitor_enabled": true,
         self.monitor_enabled = self.config["system_config"].get("alert_monitor_enabled", True)
 
-        self.last_triggered: Dict[str, float] = {}
+        # Last send time per (position id, severity code); see LIQUID_LEVELS.
+        self.last_triggered: Dict[Tuple[str, int], float] = {}
+
+        # One logged-in SMTP session, opened lazily and shared by email + SMS sends.
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._smtp_lock = threading.Lock()
+
+        # Alerts go into a bounded outbox drained by one notifier thread at a throttled
+        # rate, so neither a slow SMTP round-trip nor a burst of alerts (e.g. every
+        # position crossing -75% at once) holds up evaluation. One thread: every send
+        # shares the single session above. When full, the oldest queued alert is dropped.
+        self._notify_bucket = TokenBucket(
+            rate=self.config.get("alert_notify_rate_per_sec", 0.2),  # one send / 5s sustained
+            burst=self.config.get("alert_notify_burst", 5)
+        )
+        self._outbox: Deque[str] = deque(maxlen=self.config.get("alert_notify_queue_size", 50))
+        self._outbox_ready = threading.Condition()
+        self._closing = False
+        self._notifier = threading.Thread(target=self._drain_outbox, name="alert-notify", daemon=True)
+        self._notifier.start()
         logger.info("AlertManagerV2 started. poll_interval=%s, cooldown=%s", poll_interval, self.cooldown)
 
     def run(self):
+        try:
+            asyncio.run(self.run_async())
+        finally:
+            self.close()
+
+    async def run_async(self):
+        """
+        Ticks every poll_interval seconds on the event loop. Each check runs in the
+        default executor, so a slow SMTP send no longer delays the next tick; a tick
+        is skipped if the previous check is still running.
+        """
+        loop = asyncio.get_running_loop()
+        pending = None
         while True:
-            self.check_alerts()
-            time.sleep(self.poll_interval)
+            if pending is None or pending.done():
+                pending = loop.run_in_executor(None, self.check_alerts)
+                pending.add_done_callback(self._log_check_failure)
+            else:
+                logger.debug("Previous alert check still running; skipping this tick.")
+            await asyncio.sleep(self.poll_interval)
+
+    @staticmethod
+    def _log_check_failure(future: asyncio.Future):
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is not None:
+            logger.error("Alert check failed: %s", exc, exc_info=exc)
+
+    def close(self):
+        """
+        Stops the notifier thread (unsent alerts are dropped), then closes the sqlite
+        connections and SMTP session.
+        """
+        with self._outbox_ready:
+            self._closing = True
+            self._outbox_ready.notify()
+        self._notifier.join()
+        for conn in (self._read_conn, self._write_conn):
+            if conn is not None:
+                conn.close()
+        self._read_conn = None
+        self._write_conn = None
+        with self._smtp_lock:
+            self._close_smtp()
 
     def check_alerts(self):
         if not self.monitor_enabled:
@@ -70,52 +198,89 @@ class AlertManagerV2:
         if val >= 0:
             return  # skip
 
-        pos_id = pos.get("id", "unknown")
-        asset = pos.get("asset_type", "???")
-
         # e.g. liquid_cfg = {"low": -25.0, "medium": -50.0, "high": -75.0}
-        low = self.liquid_cfg["low"]
-        medium = self.liquid_cfg["medium"]
-        high = self.liquid_cfg["high"]
-
-        # if val <= -75 => HIGH
-        # elif val <= -50 => MEDIUM
-        # elif val <= -25 => LOW
-        # else => no alert
-        alert_level = None
-        if val <= high:
-            alert_level = "HIGH"
-        elif val <= medium:
-            alert_level = "MEDIUM"
-        elif val <= low:
-            alert_level = "LOW"
-        else:
+        # val <= -75 => HIGH, val <= -50 => MEDIUM, val <= -25 => LOW, else no alert
+        severity = bisect_left(self._liquid_edges, val)
+        if severity == len(LIQUID_LEVELS):
             return
 
-        # cooldown check
-        key = f"{pos_id}-{alert_level}"
+        pos_id = pos.get("id", "unknown")
+
+        # cooldown check, keyed by the integer severity code
+        key = (pos_id, severity)
         now = time.time()
         last_time = self.last_triggered.get(key, 0)
         if (now - last_time) < self.cooldown:
-            logger.debug("Skipping repeated alert for %s => %s (cooldown).", pos_id, alert_level)
+            logger.debug("Skipping repeated alert for %s => %s (cooldown).", pos_id, LIQUID_LEVELS[severity])
             return
 
         self.last_triggered[key] = now
 
+        # Level names are only needed for the message itself, which is built once
+        # and used both as the log line and as the notification body.
+        alert_level = LIQUID_LEVELS[severity]
+        asset = pos.get("asset_type", "???")
+
         message = (f"Travel Percent Liquid ALERT\n"
                    f"Position ID: {pos_id}, Asset: {asset}\n"
                    f"Current Travel%={val:.2f}% => {alert_level} zone.")
         logger.info("Triggering Travel%% alert => %s", message)
 
-        self.send_email(message)
-        self.send_sms(message)
+        self._queue_notification(message)
+
+    def _queue_notification(self, message: str):
+        with self._outbox_ready:
+            if len(self._outbox) == self._outbox.maxlen:
+                logger.warning("Notification outbox full; dropping the oldest queued alert.")
+            self._outbox.append(message)
+            self._outbox_ready.notify()
+
+    def _drain_outbox(self):
+        """
+        Notifier thread: sends queued alerts one at a time, waiting for a token
+        from _notify_bucket before each send.
+        """
+        while True:
+            with self._outbox_ready:
+                while not self._outbox and not self._closing:
+                    self._outbox_ready.wait()
+                if self._closing:
+                    if self._outbox:
+                        logger.warning("Dropping %d unsent alert(s) on shutdown.", len(self._outbox))
+                    return
+                delay = self._notify_bucket.take()
+                if delay:
+                    self._outbox_ready.wait(delay)
+                    continue
+                message = self._outbox.popleft()
+            self.send_alert(message)
+
+    def send_alert(self, body: str):
+        """
+        Delivers `body` to every enabled channel (email recipient and/or SMS gateway
+        address) as a single message: one DATA with one RCPT TO per channel on the
+        shared session, instead of one full SMTP transaction per channel.
+        """
+        recipients = self._alert_recipients
+        if not recipients:
+            logger.debug("No alert channels enabled; not sending.")
+            return
+        user = self.email_conf["smtp_user"]
+
+        msg = MIMEText(body)
+        msg["Subject"] = "Sonic TravelPercent Alert"
+        msg["From"] = user
+        msg["To"] = ", ".join(recipients)
+
+        try:
+            self._send_message(msg, recipients)
+            logger.info("Alert sent to %s", ", ".join(recipients))
+        except Exception as e:
+            logger.error("Failed to send alert: %s", e, exc_info=True)
 
     def send_email(self, body: str):
         try:
-            smtp_server = self.email_conf["smtp_server"]
-            port = int(self.email_conf["smtp_port"])
             user = self.email_conf["smtp_user"]
-            password = self.email_conf["smtp_password"]
             recipient = self.email_conf["recipient_email"]
 
             msg = MIMEText(body)
@@ -123,11 +288,7 @@ class AlertManagerV2:
             msg["From"] = user
             msg["To"] = recipient
 
-            with smtplib.SMTP(smtp_server, port) as server:
-                server.ehlo()
-                server.starttls()
-                server.login(user, password)
-                server.sendmail(user, [recipient], msg.as_string())
+            self._send_message(msg, [recipient])
 
             logger.info("Email alert sent to %s", recipient)
         except Exception as e:
@@ -138,10 +299,7 @@ class AlertManagerV2:
         number = self.sms_conf["recipient_number"]
         sms_address = f"{number}@{gateway}"
 
-        smtp_server = self.email_conf["smtp_server"]
-        port = int(self.email_conf["smtp_port"])
         user = self.email_conf["smtp_user"]
-        password = self.email_conf["smtp_password"]
 
         msg = MIMEText(body)
         msg["Subject"] = "Sonic TravelPercent Alert (SMS)"
@@ -149,16 +307,62 @@ class AlertManagerV2:
         msg["To"] = sms_address
 
         try:
-            with smtplib.SMTP(smtp_server, port) as server:
-                server.ehlo()
-                server.starttls()
-                server.login(user, password)
-                server.sendmail(user, [sms_address], msg.as_string())
+            self._send_message(msg, [sms_address])
 
             logger.info("SMS alert sent to %s", sms_address)
         except Exception as e:
             logger.error("Failed to send SMS: %s", e, exc_info=True)
 
+    def _send_message(self, msg: MIMEText, recipients: List[str]):
+        """
+        Sends `msg` over the cached SMTP session, reconnecting once if the server
+        dropped it since the last probe. The message is serialized once, before
+        taking the lock, and the same payload is reused for the retry.
+        """
+        user = self.email_conf["smtp_user"]
+        payload = msg.as_string()
+        with self._smtp_lock:
+            try:
+                self._get_smtp().sendmail(user, recipients, payload)
+            except smtplib.SMTPServerDisconnected:
+                self._close_smtp()
+                self._get_smtp().sendmail(user, recipients, payload)
+
+    def _get_smtp(self) -> smtplib.SMTP:
+        """
+        Returns the logged-in SMTP session, opening it (STARTTLS + login) on first use.
+        A NOOP probe detects sessions the server has timed out. Caller holds _smtp_lock.
+        """
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close_smtp()
+
+        server = smtplib.SMTP(self.email_conf["smtp_server"], int(self.email_conf["smtp_port"]))
+        try:
+            server.ehlo()
+            server.starttls()
+            server.login(self.email_conf["smtp_user"], self.email_conf["smtp_password"])
+        except Exception:
+            server.close()
+            raise
+        self._smtp = server
+        return server
+
+    def _close_smtp(self):
+        """
+        Quits the cached SMTP session, if any. Caller holds _smtp_lock.
+        """
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG)
@@ -1,7 +1,143 @@
 # calc_services.py
 
-from typing import Optional, List, Dict
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import ClassVar, Optional, List, Dict, Tuple
+import logging
 import sqlite3
+import threading
+
+logger = logging.getLogger("CalcServicesLogger")
+
+# Persists aggregator_positions results. One fixed string, so sqlite3's statement
+# cache reuses the prepared statement across calls; id is the positions PRIMARY KEY.
+UPDATE_AGGREGATES_SQL = """
+    UPDATE positions
+       SET current_travel_percent = ?,
+           liquidation_distance = ?
+     WHERE id = ?
+"""
+
+# Direction for the position_type spellings the app actually stores, so the common
+# case is one dict lookup instead of a case-folded copy of the string per position.
+# Anything else falls back to the case-insensitive checks.
+_IS_LONG_BY_TYPE: Dict[str, bool] = {
+    "LONG": True, "Long": True, "long": True,
+    "SHORT": False, "Short": False, "short": False,
+}
+
+
+def _f64(d: dict, key: str) -> float:
+    """
+    d[key] as a float: floats pass through as-is; missing, None or empty values become 0.0.
+    """
+    value = d.get(key)
+    return value if type(value) is float else (float(value) if value else 0.0)
+
+
+@dataclass(slots=True)
+class PositionView:
+    """
+    Typed snapshot of a position dict's numeric fields, parsed once per position
+    so the aggregator paths read attributes instead of repeating dict.get + float().
+    The position type is reduced to a bool once here, so downstream math branches
+    on is_long instead of comparing strings.
+    """
+    is_long: bool
+    entry_price: float
+    current_price: float
+    liquidation_price: float
+    collateral: float
+    size: float
+
+    @classmethod
+    def from_dict(cls, pos: dict) -> "PositionView":
+        raw_ptype = pos.get("position_type") or "LONG"
+        is_long = _IS_LONG_BY_TYPE.get(raw_ptype)
+        if is_long is None:
+            is_long = "short" not in raw_ptype.lower()
+        return cls(
+            is_long=is_long,
+            entry_price=float(pos.get("entry_price", 0.0)),
+            current_price=float(pos.get("current_price", 0.0)),
+            liquidation_price=float(pos.get("liquidation_price", 0.0)),
+            collateral=float(pos.get("collateral", 0.0)),
+            size=float(pos.get("size", 0.0)),
+        )
+
+
+def position_metrics(
+        is_long: bool,
+        entry_price: float,
+        current_price: float,
+        collateral: float,
+        size: float
+) -> Tuple[float, float, float]:
+    """
+    Per-position kernel shared by aggregator_positions and prepare_positions_for_display.
+    Returns (value, leverage, heat_index) where value = collateral + PnL,
+    leverage = size / collateral and heat_index = size * leverage / collateral.
+    Results are unrounded; callers round what they hand out, as the public
+    calculate_* helpers do.
+    """
+    if entry_price > 0:
+        token_count = size / entry_price
+        if is_long:
+            pnl = (current_price - entry_price) * token_count
+        else:
+            pnl = (entry_price - current_price) * token_count
+    else:
+        pnl = 0.0
+
+    if collateral > 0:
+        leverage = size / collateral
+        heat_index = (size * leverage) / collateral
+    else:
+        leverage = 0.0
+        heat_index = 0.0
+
+    return collateral + pnl, leverage, heat_index
+
+
+def _travel_fast(
+        is_long: bool,
+        entry_price: float,
+        current_price: float,
+        liquidation_price: float,
+        profit_span: float
+) -> float:
+    """
+    Unchecked core of CalcServices.calculate_travel_percent. Expects floats with
+    entry_price > 0 and liquidation_price > 0 already established by the caller.
+    profit_span is the distance from entry to the profit anchor (+100%); with the
+    default anchor of entry_price * 2 that is just entry_price.
+    """
+    if is_long:
+        if current_price < entry_price:
+            # Negative side => -100% at liquidation
+            denom = entry_price - liquidation_price
+            return ((current_price - entry_price) / -abs(denom)) * 100 if denom else 0.0
+        return ((current_price - entry_price) / profit_span) * 100 if profit_span else 0.0
+    if current_price > entry_price:
+        denom = liquidation_price - entry_price
+        return ((entry_price - current_price) / -abs(denom)) * 100 if denom else 0.0
+    return ((entry_price - current_price) / profit_span) * 100 if profit_span else 0.0
+
+
+def _travel_no_profit_fast(
+        is_long: bool,
+        entry_price: float,
+        current_price: float,
+        liquidation_price: float
+) -> float:
+    """
+    Unchecked core of CalcServices.calculate_travel_percent_no_profit. Expects floats;
+    the caller has already returned 0.0 for non-positive prices or entry == liquidation,
+    so the denominator is never zero here.
+    """
+    numer = current_price - entry_price if is_long else entry_price - current_price
+    return (numer / abs(entry_price - liquidation_price)) * 100
+
 
 class CalcServices:
     """
@@ -14,207 +150,265 @@ class CalcServices:
      - Optional color coding for display.
     """
 
+    # Ranges for color coding (used by get_color), built once per process rather
+    # than per instance. Adjust as needed or remove if you don't want color-coded fields.
+    color_ranges: ClassVar[Dict[str, Tuple[Tuple[float, float, str], ...]]] = {
+        "travel_percent": (
+            (0, 25, "green"),
+            (25, 50, "yellow"),
+            (50, 75, "orange"),
+            (75, 100, "red")
+        ),
+        "heat_index": (
+            (0, 20, "blue"),
+            (20, 40, "green"),
+            (40, 60, "yellow"),
+            (60, 80, "orange"),
+            (80, 100, "red")
+        ),
+        "collateral": (
+            (0, 500, "lightgreen"),
+            (500, 1000, "yellow"),
+            (1000, 2000, "orange"),
+            (2000, 10000, "red")
+        )
+    }
+
+    # Per metric: (lowest bound, sorted upper bounds, colors) so get_color can
+    # binary-search instead of scanning. Assumes each metric's ranges are contiguous.
+    # colors has a trailing "red" for values above every upper bound.
+    _color_bounds: ClassVar[Dict[str, Tuple[float, Tuple[float, ...], Tuple[str, ...]]]] = {
+        metric: (
+            ranges[0][0],
+            tuple(upper for (_, upper, _) in ranges),
+            tuple(color for (_, _, color) in ranges) + ("red",)
+        )
+        for metric, ranges in color_ranges.items()
+    }
+
     def __init__(self):
-        # Ranges for color coding (used by get_color).
-        # Adjust as needed or remove if you don't want color-coded fields.
-        self.color_ranges = {
-            "travel_percent": [
-                (0, 25, "green"),
-                (25, 50, "yellow"),
-                (50, 75, "orange"),
-                (75, 100, "red")
-            ],
-            "heat_index": [
-                (0, 20, "blue"),
-                (20, 40, "green"),
-                (40, 60, "yellow"),
-                (60, 80, "orange"),
-                (80, 100, "red")
-            ],
-            "collateral": [
-                (0, 500, "lightgreen"),
-                (500, 1000, "yellow"),
-                (1000, 2000, "orange"),
-                (2000, 10000, "red")
-            ]
-        }
+        # One sqlite connection per db_path for aggregator_positions, shared by every
+        # thread; _conn_lock serialises the writes that go through it.
+        self._conns: Dict[str, sqlite3.Connection] = {}
+        self._conn_lock = threading.Lock()
 
     def calculate_value(self, position):
+        return round(self.calculate_value_raw(position), 2)
+
+    def calculate_value_raw(self, position) -> float:
+        """
+        calculate_value without the display rounding, for callers that keep computing.
+        """
         # Since size is *already* in USD, just return it
-        size = float(position.get("size", 0.0))
-        return round(size, 2)
+        return _f64(position, "size")
 
     def calculate_leverage(self, size: float, collateral: float) -> float:
+        return round(self.calculate_leverage_raw(size, collateral), 2)
+
+    def calculate_leverage_raw(self, size: float, collateral: float) -> float:
+        """
+        calculate_leverage without the display rounding, for callers that keep computing.
+        """
         if size <= 0 or collateral <= 0:
             return 0.0
-        return round(size / collateral, 2)
+        return size / collateral
 
     def calculate_travel_percent(
             self,
             position_type: str,
             entry_price: float,
             current_price: float,
-            liquidation_price: float
+            liquidation_price: float,
+            profit_price: Optional[float] = None
     ) -> float:
         """
         Example function that calculates travel_percent for both LONG and SHORT.
         Adjust as needed to fit your exact logic.
+        +100% is reached at profit_price; without one (None or <= 0) the anchor
+        defaults to entry_price * 2. For travel % with no profit anchor at all,
+        see calculate_travel_percent_no_profit.
         """
-        ptype = position_type.upper()
-
         # Basic checks
         if entry_price <= 0 or liquidation_price <= 0:
             return 0.0
 
-        # Helper to avoid dividing by zero
-        def pct_of_range(numer, denom):
-            return (numer / denom) * 100 if denom else 0.0
-
-        # Default to 0.0 so we always have something to return
-        travel_percent = 0.0
-
-        profit_price = entry_price * 2
-
-        if ptype == "LONG":
-            if current_price < entry_price:
-                # Negative side => -100% at liquidation
-                denom = (entry_price - liquidation_price)
-                numer = (current_price - entry_price)
-                travel_percent = pct_of_range(numer, -abs(denom))
-            else:
-                # Positive side => +100% at profit_price
-                denom = (profit_price - entry_price)
-                numer = (current_price - entry_price)
-                travel_percent = pct_of_range(numer, denom)
-        else:  # SHORT
-            if current_price > entry_price:
-                # Negative side => -100% at liquidation
-                denom = (liquidation_price - entry_price)
-                numer = (entry_price - current_price)
-                travel_percent = pct_of_range(numer, -abs(denom))
-            else:
-                # Positive side => +100% at profit_price
-                denom = abs(entry_price - profit_price)
-                numer = (entry_price - current_price)
-                travel_percent = pct_of_range(numer, denom)
+        is_long = _IS_LONG_BY_TYPE.get(position_type)
+        if is_long is None:
+            is_long = position_type.upper() == "LONG"
+        if profit_price is None or profit_price <= 0:
+            profit_span = entry_price
+        elif is_long:
+            profit_span = profit_price - entry_price
+        else:
+            profit_span = abs(entry_price - profit_price)
 
-        return travel_percent
+        return _travel_fast(is_long, entry_price, current_price, liquidation_price, profit_span)
 
     def aggregator_positions(
             self,
             positions: List[dict],
-            db_path: str
+            db_path: str,
+            conn: Optional[sqlite3.Connection] = None
     ) -> List[dict]:
         """
         1) For each position in `positions`, we compute Travel Percent WITHOUT a profit_price.
         2) Overwrite pos["current_travel_percent"] with the new value.
-        3) Update the DB so 'current_travel_percent' is persisted.
+        3) Update the DB so 'current_travel_percent' and 'liquidation_distance' are
+           persisted, as one batched UPDATE in a single transaction covering only the
+           positions whose values differ from what they came in with. Pass `conn` to
+           use a caller-owned connection; otherwise the shared connection to
+           `db_path` is used (see _get_conn).
         4) (Optionally) do basic PnL => 'value' = collateral + (pnl),
            and set pos["leverage"] = size/collateral,
            pos["heat_index"] = ...
         5) Return the updated positions list.
         """
-
-        import sqlite3
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        rows = []
+        # Loop-invariant lookups bound once
+        from_dict = PositionView.from_dict
+        travel_no_profit = _travel_no_profit_fast
+        metrics = position_metrics
+        _round = round
+        add_row = rows.append
 
         for pos in positions:
-            # 1) Basic fields
-            position_type = (pos.get("position_type") or "LONG").upper()
-            entry_price = float(pos.get("entry_price", 0.0))
-            current_price = float(pos.get("current_price", 0.0))
-            liquidation_price = float(pos.get("liquidation_price", 0.0))
-            collateral = float(pos.get("collateral", 0.0))
-            size = float(pos.get("size", 0.0))
-
-            # 2) Calculate Travel % (no profit anchor)
-            travel_percent = self.calculate_travel_percent_no_profit(
-                position_type,
-                entry_price,
-                current_price,
-                liquidation_price
-            )
-            pos["current_travel_percent"] = travel_percent
-
-            pos["liquidation_distance"] = self.calculate_liquid_distance(
-                current_price=pos.get("current_price", 0.0),
-                liquidation_price=pos.get("liquidation_price", 0.0)
-            )
-
-            # 3) Update DB
-            try:
-                cursor.execute("""
-                    UPDATE positions
-                       SET current_travel_percent = ?
-                     WHERE id = ?
-                """, (travel_percent, pos["id"]))
-            except Exception as e:
-                print(f"Error updating travel_percent for position {pos['id']}: {e}")
-
-            try:
-                cursor.execute(
-                    """
-                    UPDATE positions
-                       SET liquidation_distance = ?
-                     WHERE id = ?
-                    """,
-                    (pos["liquidation_distance"], pos["id"])
+            # 1) Basic fields, parsed once
+            view = from_dict(pos)
+            entry_price = view.entry_price
+            current_price = view.current_price
+            collateral = view.collateral
+            size = view.size
+            liquidation_price = view.liquidation_price
+
+            # 2) Calculate Travel % (no profit anchor); view is already normalized
+            if entry_price <= 0 or liquidation_price <= 0 or entry_price == liquidation_price:
+                travel_percent = 0.0
+            else:
+                travel_percent = travel_no_profit(
+                    view.is_long,
+                    entry_price,
+                    current_price,
+                    liquidation_price
                 )
-            except Exception as e:
-                print(f"Error updating liquidation_distance for position {pos['id']}: {e}")
+            # Same as calculate_liquid_distance; the view's floats are never None
+            liquidation_distance = round(abs(liquidation_price - current_price), 2)
 
+            # Positions read from the DB carry the stored values; only rows whose
+            # results changed are written, so a refresh on unchanged prices is a no-op.
+            if (pos.get("current_travel_percent") != travel_percent
+                    or pos.get("liquidation_distance") != liquidation_distance):
+                add_row((travel_percent, liquidation_distance, pos["id"]))
 
-            # (Optional) Basic PnL => Value
-            # Just an example:
-            if entry_price > 0:
-                token_count = size / entry_price
-                if position_type == "LONG":
-                    pnl = (current_price - entry_price) * token_count
-                else:
-                    pnl = (entry_price - current_price) * token_count
-            else:
-                pnl = 0.0
-            pos["value"] = round(collateral + pnl, 2)
+            pos["current_travel_percent"] = travel_percent
+            pos["liquidation_distance"] = liquidation_distance
 
-            # (Optional) Leverage = size / collateral
-            if collateral > 0:
-                pos["leverage"] = round(size / collateral, 2)
+            # (Optional) Value = collateral + PnL, leverage, heat index, rounded
+            # like prepare_positions_for_display since they go to the template as-is
+            value, leverage, heat_index = metrics(
+                view.is_long, entry_price, current_price, collateral, size
+            )
+            pos["value"] = _round(value, 2)
+            pos["leverage"] = _round(leverage, 2)
+            pos["heat_index"] = _round(heat_index, 2)
+
+        # 3) Update DB
+        if rows:
+            if conn is not None:
+                self._persist_aggregates(conn, rows)
             else:
-                pos["leverage"] = 0.0
+                with self._conn_lock:
+                    self._persist_aggregates(self._get_conn(db_path), rows)
 
-            # (Optional) Heat Index
-            pos["heat_index"] = self.calculate_heat_index(pos) or 0.0
+        return positions
 
-        conn.commit()
-        conn.close()
+    def _get_conn(self, db_path: str) -> sqlite3.Connection:
+        """
+        Returns the shared connection to `db_path`, opening (and tuning) it on first
+        use. Callers must hold _conn_lock, since Flask may serve requests concurrently.
+        """
+        conn = self._conns.get(db_path)
+        if conn is None:
+            conn = self._conns[db_path] = self._connect(db_path)
+        return conn
 
-        return positions
+    def close(self):
+        """
+        Closes the cached connections.
+        """
+        with self._conn_lock:
+            conns, self._conns = self._conns, {}
+        for conn in conns.values():
+            conn.close()
+
+    @staticmethod
+    def _connect(db_path: str) -> sqlite3.Connection:
+        """
+        Opens `db_path` with the app's shared tuning (WAL, synchronous=NORMAL,
+        busy_timeout, cache sizing), so the batched UPDATE commits with one WAL append.
+        """
+        # Imported here: data.data_locker imports this module at load time.
+        from data.data_locker import apply_sqlite_pragmas
+        return apply_sqlite_pragmas(sqlite3.connect(db_path, check_same_thread=False))
+
+    @staticmethod
+    def _persist_aggregates(conn: sqlite3.Connection, rows: List[tuple]):
+        """
+        Writes aggregator_positions rows with one executemany in one transaction.
+        If the batch fails it is rolled back and retried row by row, so a bad row is
+        logged on its own (as the old per-row UPDATEs did) and the rest still land.
+        """
+        try:
+            with conn:
+                conn.executemany(UPDATE_AGGREGATES_SQL, rows)
+            return
+        except Exception as e:
+            logger.warning("Batched update of %d positions failed (%s); retrying row by row.", len(rows), e)
+
+        for row in rows:
+            try:
+                with conn:
+                    conn.execute(UPDATE_AGGREGATES_SQL, row)
+            except Exception as e:
+                logger.error("Error updating travel_percent/liquidation_distance for position %s: %s", row[2], e)
 
     def calculate_liquid_distance(self, current_price: float, liquidation_price: float) -> float:
         """
         Absolute difference between current_price and liquidation_price.
         Defaults to 0.0 if either is missing.
         """
+        return round(self.calculate_liquid_distance_raw(current_price, liquidation_price), 2)
+
+    def calculate_liquid_distance_raw(self, current_price: float, liquidation_price: float) -> float:
+        """
+        calculate_liquid_distance without the display rounding.
+        """
         if current_price is None:
             current_price = 0.0
         if liquidation_price is None:
             liquidation_price = 0.0
-        return round(abs(liquidation_price - current_price), 2)
+        return abs(liquidation_price - current_price)
 
     def calculate_heat_index(self, position: dict) -> Optional[float]:
         """
         Example "heat index" = (size * leverage) / collateral, or some variation.
         Returns None if collateral <= 0, else a float.
         """
-        size = float(position.get("size", 0.0) or 0.0)
-        leverage = float(position.get("leverage", 0.0) or 0.0)
-        collateral = float(position.get("collateral", 0.0) or 0.0)
+        hi = self.calculate_heat_index_raw(position)
+        if hi is None:
+            return None
+        return round(hi, 2)
+
+    def calculate_heat_index_raw(self, position: dict) -> Optional[float]:
+        """
+        calculate_heat_index without the display rounding.
+        """
+        size = _f64(position, "size")
+        leverage = _f64(position, "leverage")
+        collateral = _f64(position, "collateral")
 
         if collateral <= 0:
             return None  # or 0.0, depending on your preference
-        hi = (size * leverage) / collateral
-        return round(hi, 2)
+        return (size * leverage) / collateral
 
     def calculate_travel_percent_no_profit(
             self,
@@ -248,101 +442,72 @@ class CalcServices:
         if entry_price <= 0 or liquidation_price <= 0 or entry_price == liquidation_price:
             return 0.0
 
-        ptype = position_type.upper()
-
-        # Helper to avoid dividing by zero
-        def safe_ratio(numer, denom):
-            if denom == 0:
-                return 0.0
-            return (numer / denom) * 100
-
-        if ptype == "LONG":
-            # Denominator is always (entry_price - liquidation_price) for negative side
-            denom = abs(entry_price - liquidation_price)
-            # Numer is (current_price - entry_price)
-            numer = current_price - entry_price
-            # Negative side => if current < entry, it heads to -100% near liquidation
-            # Positive side => if current > entry, you get >0%. No cap.
-            # We'll flip the sign so that liquidation => -100%.
-            travel_percent = safe_ratio(numer, denom)
-        else:
-            # SHORT
-            denom = abs(entry_price - liquidation_price)
-            numer = entry_price - current_price
-            travel_percent = safe_ratio(numer, denom)
-
-        return travel_percent
+        # LONG: (current - entry) / |entry - liquidation|; SHORT flips the numerator,
+        # so liquidation => -100% either way and gains are uncapped.
+        is_long = _IS_LONG_BY_TYPE.get(position_type)
+        if is_long is None:
+            is_long = position_type.upper() == "LONG"
+        return _travel_no_profit_fast(is_long, entry_price, current_price, liquidation_price)
 
     def prepare_positions_for_display(self, positions: List[dict]) -> List[dict]:
+        """
+        Single pass over `positions`: each input field is read from the dict once,
+        every derived field (travel %, value, leverage, heat index) is computed from
+        those locals, and the results are written back with one update per position.
+        """
         processed_positions = []
+        debug = logger.isEnabledFor(logging.DEBUG)
 
-        for idx, pos in enumerate(positions, start=1):
-            print(f"\n[DEBUG] Position #{idx} BEFORE aggregator => {pos}")
+        # Loop-invariant lookups bound once
+        from_dict = PositionView.from_dict
+        travel = _travel_fast
+        metrics = position_metrics
+        _round = round
+        keep = processed_positions.append
 
-            # 1) Position type logic
-            raw_ptype = pos.get("position_type", "LONG")
-            ptype_lower = raw_ptype.strip().lower()
-            if "short" in ptype_lower:
-                position_type = "SHORT"
+        for idx, pos in enumerate(positions, start=1):
+            # 1) Position type + numeric fields, parsed once
+            view = from_dict(pos)
+            is_long = view.is_long
+            entry_price = view.entry_price
+            current_price = view.current_price
+            collateral = view.collateral
+            size = view.size
+            liquidation_price = view.liquidation_price
+
+            # 2) Travel % (PositionView already normalized the type and floats)
+            if entry_price <= 0 or liquidation_price <= 0:
+                travel_percent = 0.0
             else:
-                position_type = "LONG"
-
-            # 2) Grab fields
-            entry_price = float(pos.get("entry_price", 0.0))
-            current_price = float(pos.get("current_price", 0.0))
-            collateral = float(pos.get("collateral", 0.0))
-            size = float(pos.get("size", 0.0))
-            liquidation_price = float(pos.get("liquidation_price", 0.0))
-
-            # 3) Calculate 'calculate_travel_percent'
-            pos["current_travel_percent"] = self.calculate_travel_percent(
-                position_type,
-                entry_price,
-                current_price,
-                liquidation_price
-            )
+                travel_percent = travel(
+                    is_long,
+                    entry_price,
+                    current_price,
+                    liquidation_price,
+                    entry_price
+                )
 
-            # ---------------------------
-            # NEW CODE HERE
-            # Overwrite current_travel_percent with that newly computed value:
-            # ---------------------------
-            pos["current_travel_percent"] = self.calculate_travel_percent(
-                position_type,
-                entry_price,
-                current_price,
-                liquidation_price
+            # 3) PnL, value, leverage, heat_index from the locals above
+            value, leverage, heat_index = metrics(
+                is_long, entry_price, current_price, collateral, size
             )
-            # ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
-            # This is the missing link: now 'current_travel_percent' won't stay at zero!
-            # ---------------------------
-
-            print(f"[DEBUG] Normalized => type={position_type}, "
-                  f"entry={entry_price}, current={current_price}, "
-                  f"collat={collateral}, size={size}, "
-                  f"travel_percent={pos['current_travel_percent']}")
-
-            # (rest of aggregator logic)...
-            # PnL, value, leverage, heat_index, etc.
-            if entry_price <= 0:
-                pnl = 0.0
-            else:
-                token_count = size / entry_price
-                if position_type == "LONG":
-                    pnl = (current_price - entry_price) * token_count
-                else:
-                    pnl = (entry_price - current_price) * token_count
-
-            pos["value"] = round(collateral + pnl, 2)
-            if collateral > 0:
-                pos["leverage"] = round(size / collateral, 2)
-            else:
-                pos["leverage"] = 0.0
 
-            pos["heat_index"] = self.calculate_heat_index(pos) or 0.0
+            # Display boundary: rounded as calculate_value/calculate_leverage do
+            pos.update(
+                current_travel_percent=travel_percent,
+                value=_round(value, 2),
+                leverage=_round(leverage, 2),
+                heat_index=_round(heat_index, 2),
+            )
 
-            print(f"[DEBUG] Position #{idx} AFTER aggregator => {pos}")
+            # Log the fields this pass reads and writes rather than the whole dict
+            if debug:
+                logger.debug("Position #%d id=%s: is_long=%s, entry=%s, current=%s, liq=%s, "
+                             "collat=%s, size=%s => travel_percent=%s, value=%s, leverage=%s, heat_index=%s",
+                             idx, pos.get("id"), is_long, entry_price, current_price, liquidation_price,
+                             collateral, size, travel_percent, value, leverage, heat_index)
 
-            processed_positions.append(pos)
+            keep(pos)
 
         return processed_positions
 
@@ -408,13 +573,13 @@ class CalcServices:
 
     def get_color(self, value: float, metric: str) -> str:
         """
-        Returns a color string based on the metric's predefined ranges in self.color_ranges.
+        Returns a color string based on the metric's predefined ranges in color_ranges.
         If the metric isn't found, defaults to "white".
         """
-        if metric not in self.color_ranges:
+        bounds = self._color_bounds.get(metric)
+        if bounds is None:
             return "white"
-        for (lower, upper, color) in self.color_ranges[metric]:
-            if lower <= value < upper:
-                return color
-        # If it exceeds all upper bounds, default to the last color or "red"
-        return "red"
+        lowest, uppers, colors = bounds
+        if value < lowest:
+            return "red"
+        return colors[bisect_right(uppers, value)]
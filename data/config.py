@@ -1,9 +1,12 @@
-# data/hybrid_config_manager.py
+# data/config.py
 import json
 import logging
-from pydantic import BaseModel, Field, ValidationError
-from typing import Any, Dict
-from pydantic import ValidationError
+import os
+from functools import lru_cache
+from pydantic import BaseModel, ValidationError
+from data import hybrid_config_manager
+
+logger = logging.getLogger("HybridConfigLoader")
 
 # 2. Define AppConfig FIRST
 class AppConfig(BaseModel):
@@ -13,88 +16,34 @@ class AppConfig(BaseModel):
     api_config: dict = {}
     alert_ranges: dict = {}
 
-# 3. Then define load_config_hybrid
-def load_config_hybrid(json_path: str, db_conn) -> AppConfig:
-    # read JSON, read DB overrides, merge them, then do:
-    return AppConfig(**merged_data)
-
-logger = logging.getLogger("HybridConfigLoader")
-
-def deep_merge_dicts(base: Dict[str, Any], overrides: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Recursively merges 'overrides' into 'base'.
-    If both base[key] and overrides[key] are dict, merge them.
-    Otherwise, overrides[key] overwrites base[key].
-    """
-    merged = dict(base)  # shallow copy
-    for key, val in overrides.items():
-        if (key in merged
-            and isinstance(merged[key], dict)
-            and isinstance(val, dict)):
-            merged[key] = deep_merge_dicts(merged[key], val)
-        else:
-            merged[key] = val
-    return merged
-
-def ensure_overrides_table(db_conn):
-    """
-    Creates the 'config_overrides' table if it doesn't exist,
-    and ensures there's a row with id=1 so we can do an UPDATE easily.
-    """
-    try:
-        db_conn.execute("""
-            CREATE TABLE IF NOT EXISTS config_overrides (
-                id INTEGER PRIMARY KEY,
-                overrides TEXT
-            )
-        """)
-        db_conn.execute("""
-            INSERT OR IGNORE INTO config_overrides (id, overrides)
-            VALUES (1, '{}')
-        """)
-        db_conn.commit()
-    except Exception as e:
-        logger.error(f"Error ensuring config_overrides table: {e}")
-
-def load_overrides_from_db(db_conn) -> Dict[str, Any]:
-    """
-    Safely queries the DB for config overrides, returns them as a dict.
-    """
-    try:
-        ensure_overrides_table(db_conn)
-        row = db_conn.execute("SELECT overrides FROM config_overrides WHERE id=1").fetchone()
-        if row and row[0]:
-            return json.loads(row[0])
-        return {}
-    except Exception as e:
-        logger.error(f"Could not load overrides from DB: {e}")
-        return {}
-
-def load_json_config(json_path: str) -> Dict[str, Any]:
-    """
-    Loads a JSON file, returns a dict. If missing/bad, returns empty.
-    """
-    try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        logger.warning(f"Config file '{json_path}' not found. Returning empty dict.")
-        return {}
-    except json.JSONDecodeError as e:
-        logger.error(f"Error parsing JSON in '{json_path}': {e}")
-        return {}
+    @classmethod
+    def load(cls, config_path: str) -> "AppConfig":
+        """
+        Builds an AppConfig from the JSON file at config_path.
+        The file is parsed and validated once per (path, mtime); each call gets its
+        own copy of that model. Raises FileNotFoundError, json.JSONDecodeError or
+        ValidationError as-is.
+        """
+        mtime_ns = os.stat(config_path).st_mtime_ns
+        # Re-reading the validated model's own JSON is a deep copy done inside
+        # pydantic-core, cheaper than model_copy(deep=True) on these nested dicts.
+        return cls.model_validate_json(_validated_config_json(cls, config_path, mtime_ns))
+
+
+@lru_cache(maxsize=4)
+def _validated_config_json(cls, config_path: str, mtime_ns: int) -> str:
+    # Keyed on mtime so editing the file (or save_app_config) invalidates the entry;
+    # exceptions aren't cached, so a fixed file is picked up on the next call.
+    with open(config_path, "r", encoding="utf-8") as f:
+        return cls.model_validate(json.load(f)).model_dump_json()
 
+# 3. Then define load_config_hybrid
 def load_config_hybrid(json_path: str, db_conn) -> AppConfig:
     """
-    1) Load base config from JSON.
-    2) Load overrides from DB.
-    3) Merge them (DB overrides win).
-    4) Return a validated AppConfig.
+    Same JSON + DB-override merge as hybrid_config_manager.load_config_hybrid,
+    returned as a validated AppConfig.
     """
-    base_data = load_json_config(json_path)
-    db_overrides = load_overrides_from_db(db_conn)
-
-    merged_data = deep_merge_dicts(base_data, db_overrides)
+    merged_data = hybrid_config_manager.load_config_hybrid(json_path, db_conn)
     try:
         return AppConfig(**merged_data)
     except ValidationError as ve:
@@ -1,12 +1,90 @@
 import sqlite3
 import logging
+import queue
+from contextlib import contextmanager
+from pathlib import Path
 from data.models import Price, Alert, Position, AssetType, Status, CryptoWallet, Broker
 
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 from datetime import datetime
 from uuid import uuid4
 #from pydantic import ValidationError
 from calc_services import CalcServices
+
+# Connection tuning shared by every long-lived sqlite connection in the app.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
+
+# Read-only connections can't switch journal mode; they only need the cache settings.
+SQLITE_READ_PRAGMAS = (
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
+
+INSERT_POSITION_SQL = """
+    INSERT INTO positions (
+        id, asset_type, position_type,
+        entry_price, liquidation_price, current_travel_percent,
+        value, collateral, size, wallet_name, leverage, last_updated,
+        alert_reference_id, hedge_buddy_id, current_price,
+        liquidation_distance, heat_index, current_heat_index
+    )
+    VALUES (
+        :id, :asset_type, :position_type,
+        :entry_price, :liquidation_price, :current_travel_percent,
+        :value, :collateral, :size, :wallet_name, :leverage, :last_updated,
+        :alert_reference_id, :hedge_buddy_id, :current_price,
+        :liquidation_distance, :heat_index, :current_heat_index
+    )
+"""
+
+UPDATE_PRICE_SQL = """
+    UPDATE prices
+       SET current_price = ?,
+           last_update_time = ?,
+           source = ?
+     WHERE asset_type = ?
+"""
+
+SELECT_POSITIONS_SQL = "SELECT * FROM positions"
+SELECT_PRICES_SQL = "SELECT * FROM prices ORDER BY last_update_time DESC"
+
+# Stored asset_type string -> AssetType member; a dict lookup instead of the
+# Enum constructor for every price row read back.
+_ASSET_TYPE_BY_VALUE = {member.value: member for member in AssetType}
+
+# Idle read-only connections a DataLocker keeps for its bulk reads; readers beyond
+# this many at once get a throwaway connection instead.
+READ_POOL_SIZE = 4
+
+
+def apply_sqlite_pragmas(conn: sqlite3.Connection, pragmas=SQLITE_PRAGMAS) -> sqlite3.Connection:
+    """
+    Applies `pragmas` (SQLITE_PRAGMAS by default) to `conn` and returns it.
+    WAL lets readers proceed while a writer commits; NORMAL sync drops one fsync per commit.
+    """
+    for pragma in pragmas:
+        conn.execute(pragma)
+    return conn
+
+
+def connect_read_only(db_path: str) -> sqlite3.Connection:
+    """
+    Opens `db_path` in read-only mode (file: URI with mode=ro), tuned with SQLITE_READ_PRAGMAS.
+    """
+    uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    return apply_sqlite_pragmas(conn, SQLITE_READ_PRAGMAS)
+
+
 class DataLocker:
     """
     A synchronous DataLocker that manages database interactions using sqlite3.
@@ -18,19 +96,27 @@ class DataLocker:
 
     _instance: Optional['DataLocker'] = None
 
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, conn: Optional[sqlite3.Connection] = None):
         self.db_path = db_path
         self.logger = logging.getLogger("DataLockerLogger")
         self.conn = None
         self.cursor = None
+        # Connection pinned via conn= / set_connection(); bulk reads use it when set
+        self._pinned_conn: Optional[sqlite3.Connection] = None
+        # Read-only connections the bulk reads borrow and hand back (see _borrow_read_conn)
+        self._read_pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=READ_POOL_SIZE)
         self._initialize_database()
+        if conn is not None:
+            self.set_connection(conn)
 
     def _initialize_database(self):
         """
         Initializes the database by creating necessary tables if they do not exist.
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            # journal_mode=WAL is stored in the file, so the short-lived connections
+            # opened elsewhere in this class pick it up as well.
+            conn = apply_sqlite_pragmas(sqlite3.connect(self.db_path))
             cursor = conn.cursor()
 
             # PRICES TABLE
@@ -130,6 +216,17 @@ class DataLocker:
                         )
                     """)
 
+            # INDEXES for the lookups that run per poll / per import
+            # (latest price per asset, positions by wallet)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_prices_asset_time
+                    ON prices (asset_type, last_update_time)
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_positions_wallet_name
+                    ON positions (wallet_name)
+            """)
+
             conn.commit()
             conn.close()
 
@@ -155,12 +252,47 @@ class DataLocker:
         Ensures self.conn and self.cursor are available.
         """
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.conn = apply_sqlite_pragmas(sqlite3.connect(self.db_path, check_same_thread=False))
             self.conn.row_factory = sqlite3.Row
 
         if self.cursor is None:
             self.cursor = self.conn.cursor()
 
+    @contextmanager
+    def _borrow_read_conn(self) -> Iterator[sqlite3.Connection]:
+        """
+        Lends out the connection a bulk read goes through: the pinned connection if
+        one was set (e.g. the AlertManager's read-only one), otherwise a read-only
+        connection from the pool, opened when none is idle. It goes back to the pool
+        afterwards, or is closed if the pool is already full. With WAL these readers
+        never wait on, or block, the writer.
+        """
+        if self._pinned_conn is not None:
+            yield self._pinned_conn
+            return
+        try:
+            conn = self._read_pool.get_nowait()
+        except queue.Empty:
+            conn = connect_read_only(self.db_path)
+            conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            try:
+                self._read_pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def set_connection(self, conn: sqlite3.Connection):
+        """
+        Pins an externally owned connection (e.g. the AlertManager's long-lived one),
+        so every method that goes through _init_sqlite_if_needed() reuses it.
+        """
+        conn.row_factory = sqlite3.Row
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self._pinned_conn = conn
+
     def get_db_connection(self) -> sqlite3.Connection:
         """
         Returns the underlying sqlite3 Connection, ensuring it's initialized first.
@@ -218,7 +350,7 @@ class DataLocker:
         now_str = datetime.now().isoformat()
 
         old_count = row["total_reports"] if row else 0
-        self.logger.debug(f"Previous total_reports for {api_name} = {old_count}")
+        self.logger.debug("Previous total_reports for %s = %s", api_name, old_count)
 
         if row is None:
             # Insert new row
@@ -236,7 +368,7 @@ class DataLocker:
             """, (now_str, api_name))
 
         self.conn.commit()
-        self.logger.debug(f"Incremented API report counter for {api_name}, set last_updated={now_str}.")
+        self.logger.debug("Incremented API report counter for %s, set last_updated=%s.", api_name, now_str)
 
     def insert_price(self, price_dict: dict):
         """
@@ -289,7 +421,7 @@ class DataLocker:
             conn.commit()
             conn.close()
 
-            self.logger.debug(f"Inserted price row with ID={price_dict['id']}")
+            self.logger.debug("Inserted price row with ID=%s", price_dict['id'])
         except Exception as e:
             self.logger.exception(f"Unexpected error in insert_price: {e}")
             raise
@@ -324,11 +456,11 @@ class DataLocker:
             prices = []
             for row in rows:
                 row_dict = dict(row)
-                row_dict["asset_type"] = AssetType(row_dict["asset_type"])
+                row_dict["asset_type"] = _ASSET_TYPE_BY_VALUE[row_dict["asset_type"]]
                 p = Price(**row_dict)
                 prices.append(p)
 
-            self.logger.debug(f"Retrieved {len(prices)} price rows.")
+            self.logger.debug("Retrieved %d price rows.", len(prices))
             return prices
 
         except sqlite3.Error as e:
@@ -342,33 +474,28 @@ class DataLocker:
             return []
 
     def read_positions(self) -> List[dict]:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM positions")
-        rows = cursor.fetchall()
-        conn.close()
+        """
+        Returns all rows from `positions` as plain dicts, using a pooled read-only
+        connection instead of reopening the sqlite file on every poll.
+        """
+        with self._borrow_read_conn() as conn:
+            return list(map(dict, conn.execute(SELECT_POSITIONS_SQL)))
 
-        results = []
-        for r in rows:
-            results.append(dict(r))
-        return results
+    def iter_positions(self) -> Iterator[dict]:
+        """
+        Like read_positions, but yields each row as a dict straight off the cursor.
+        For callers that make a single pass and don't need the whole list in memory;
+        the connection is handed back once the iterator is exhausted or closed.
+        """
+        with self._borrow_read_conn() as conn:
+            yield from map(dict, conn.execute(SELECT_POSITIONS_SQL))
 
     def read_prices(self) -> List[dict]:
         """
         Returns all rows from `prices` as a list of plain dictionaries.
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM prices ORDER BY last_update_time DESC")
-        rows = cursor.fetchall()
-        conn.close()
-
-        results = []
-        for row in rows:
-            results.append(dict(row))
-        return results
+        with self._borrow_read_conn() as conn:
+            return list(map(dict, conn.execute(SELECT_PRICES_SQL)))
 
     def get_latest_price(self, asset_type: AssetType) -> Optional[Price]:
         """
@@ -390,7 +517,7 @@ class DataLocker:
 
             if row:
                 row_dict = dict(row)
-                row_dict["asset_type"] = AssetType(row_dict["asset_type"])
+                row_dict["asset_type"] = _ASSET_TYPE_BY_VALUE[row_dict["asset_type"]]
                 return Price(**row_dict)
             else:
                 return None
@@ -413,7 +540,7 @@ class DataLocker:
             cursor.execute("DELETE FROM prices WHERE id = ?", (price_id,))
             conn.commit()
             conn.close()
-            self.logger.debug(f"Deleted price row with ID={price_id}")
+            self.logger.debug("Deleted price row with ID=%s", price_id)
         except sqlite3.Error as e:
             self.logger.error(f"Database error in delete_price: {e}", exc_info=True)
             raise
@@ -452,7 +579,7 @@ class DataLocker:
             """, alert_data)
             conn.commit()
             conn.close()
-            self.logger.debug(f"Created alert with ID={alert_data['id']}")
+            self.logger.debug("Created alert with ID=%s", alert_data['id'])
 
         except ValidationError as ve:
             self.logger.error(f"Alert validation error: {ve.json()}")
@@ -481,7 +608,7 @@ class DataLocker:
                 a = Alert(**row_dict)
                 alerts.append(a)
 
-            self.logger.debug(f"Retrieved {len(alerts)} alerts from DB.")
+            self.logger.debug("Retrieved %d alerts from DB.", len(alerts))
             return alerts
 
         except sqlite3.Error as e:
@@ -506,7 +633,7 @@ class DataLocker:
             """, (new_status.value, alert_id))
             conn.commit()
             conn.close()
-            self.logger.debug(f"Updated alert {alert_id} status to {new_status}")
+            self.logger.debug("Updated alert %s status to %s", alert_id, new_status)
         except sqlite3.Error as e:
             self.logger.error(f"Database error in update_alert_status: {e}", exc_info=True)
             raise
@@ -522,7 +649,7 @@ class DataLocker:
             cursor.execute("DELETE FROM alerts WHERE id = ?", (alert_id,))
             conn.commit()
             conn.close()
-            self.logger.debug(f"Deleted alert ID={alert_id}")
+            self.logger.debug("Deleted alert ID=%s", alert_id)
         except sqlite3.Error as e:
             self.logger.error(f"Database error in delete_alert: {e}", exc_info=True)
             raise
@@ -544,28 +671,22 @@ class DataLocker:
         if timestamp is None:
             timestamp = datetime.now()
 
-        # 1) Check if there's an existing row for this asset
-        self.cursor.execute("SELECT id FROM prices WHERE asset_type = ?", (asset_type,))
-        row = self.cursor.fetchone()
-
-        if row:
-            # 2) existing row => UPDATE
-            try:
-                self.logger.debug(f"Updating existing price row for {asset_type}.")
-                self.cursor.execute("""
-                    UPDATE prices
-                       SET current_price = ?,
-                           last_update_time = ?,
-                           source = ?
-                     WHERE asset_type = ?
-                """, (current_price, timestamp.isoformat(), source, asset_type))
-                self.conn.commit()
-            except Exception as e:
-                self.logger.error(f"Error updating existing price row for {asset_type}: {e}", exc_info=True)
+        # 1) UPDATE the existing row(s) for this asset in place; rowcount tells us
+        #    whether there were any, so no separate SELECT is needed
+        try:
+            updated = self.cursor.execute(
+                UPDATE_PRICE_SQL, (current_price, timestamp.isoformat(), source, asset_type)
+            ).rowcount
+            self.conn.commit()
+        except Exception as e:
+            self.logger.error(f"Error updating existing price row for {asset_type}: {e}", exc_info=True)
+            return
 
+        if updated:
+            self.logger.debug("Updated existing price row for %s.", asset_type)
         else:
-            # 3) no row => BUILD A DICT & call insert_price(...)
-            self.logger.debug(f"No existing row for {asset_type}; inserting new price row.")
+            # 2) no row => BUILD A DICT & call insert_price(...)
+            self.logger.debug("No existing row for %s; inserting new price row.", asset_type)
             from uuid import uuid4
 
             price_dict = {
@@ -583,11 +704,11 @@ class DataLocker:
     # POSITIONS CRUD
     # ----------------------------------------------------------------
 
-    def create_position(self, pos_dict: dict):
-        from uuid import uuid4
-        from datetime import datetime
-        import sqlite3
-
+    @staticmethod
+    def _apply_position_defaults(pos_dict: dict) -> dict:
+        """
+        Fills in defaults for any missing position fields, in place, and returns pos_dict.
+        """
         # Provide defaults for missing fields
         if "id" not in pos_dict:
             pos_dict["id"] = str(uuid4())
@@ -608,34 +729,51 @@ class DataLocker:
         pos_dict.setdefault("liquidation_distance", None)
         pos_dict.setdefault("heat_index", 0.0)
         pos_dict.setdefault("current_heat_index", 0.0)
+        return pos_dict
+
+    def create_position(self, pos_dict: dict):
+        self._apply_position_defaults(pos_dict)
 
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO positions (
-                        id, asset_type, position_type,
-                        entry_price, liquidation_price, current_travel_percent,
-                        value, collateral, size, wallet_name, leverage, last_updated,
-                        alert_reference_id, hedge_buddy_id, current_price,
-                        liquidation_distance, heat_index, current_heat_index
-                    )
-                    VALUES (
-                        :id, :asset_type, :position_type,
-                        :entry_price, :liquidation_price, :current_travel_percent,
-                        :value, :collateral, :size, :wallet_name, :leverage, :last_updated,
-                        :alert_reference_id, :hedge_buddy_id, :current_price,
-                        :liquidation_distance, :heat_index, :current_heat_index
-                    )
-                """, pos_dict)
+                cursor.execute(INSERT_POSITION_SQL, pos_dict)
                 conn.commit()
 
-            self.logger.debug(f"Created position with ID={pos_dict['id']}")
+            self.logger.debug("Created position with ID=%s", pos_dict['id'])
 
         except Exception as e:
             self.logger.exception(f"Unexpected error in create_position: {e}")
             raise
 
+    def create_positions(self, pos_dicts: List[dict]):
+        """
+        Inserts many positions in one transaction (one commit instead of one per row).
+        If the batch hits a constraint (e.g. an id that already exists), it is rolled
+        back and the rows are retried one at a time through create_position, so the
+        offending row is logged and raised just as before. Like create_position, the
+        batch gets its own connection rather than the shared self.conn, so it can't
+        commit or roll back anyone else's pending writes.
+        """
+        rows = [self._apply_position_defaults(pos_dict) for pos_dict in pos_dicts]
+        if not rows:
+            return
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                conn.executemany(INSERT_POSITION_SQL, rows)
+        except sqlite3.IntegrityError as e:
+            self.logger.warning(f"Batch position insert failed ({e}); retrying row by row.")
+        else:
+            self.logger.debug("Created %d positions.", len(rows))
+            return
+        finally:
+            conn.close()
+
+        for pos_dict in rows:
+            self.create_position(pos_dict)
+
     def get_positions(self) -> List[dict]:
         """
         Returns all positions as a list of plain dictionaries.
@@ -653,7 +791,7 @@ class DataLocker:
             for row in rows:
                 results.append(dict(row))
 
-            self.logger.debug(f"Retrieved {len(results)} positions (dicts).")
+            self.logger.debug("Retrieved %d positions (dicts).", len(results))
             return results
 
         except sqlite3.Error as e:
@@ -671,7 +809,7 @@ class DataLocker:
             cursor.execute("DELETE FROM positions WHERE id = ?", (position_id,))
             conn.commit()
             conn.close()
-            self.logger.debug(f"Deleted position with ID={position_id}")
+            self.logger.debug("Deleted position with ID=%s", position_id)
         except sqlite3.Error as e:
             self.logger.error(f"Database error in delete_position: {e}", exc_info=True)
             raise
@@ -934,6 +1072,13 @@ class DataLocker:
             raise e
 
     def close(self):
+        # Pooled readers are opened with check_same_thread=False, so the idle ones
+        # can be closed from here
+        while True:
+            try:
+                self._read_pool.get_nowait().close()
+            except queue.Empty:
+                break
         self.conn.close()
 
     # ----------------------------------------------------------------
@@ -943,17 +1088,12 @@ class DataLocker:
         """
         Fetches positions as raw dictionaries directly from SQLite (no Pydantic).
         """
-        self._init_sqlite_if_needed()
-        results: List[Dict] = []
         try:
             self.logger.debug("Fetching positions as raw dictionaries...")
-            self.cursor.execute("SELECT * FROM positions")
-            rows = self.cursor.fetchall()
-
-            for row in rows:
-                results.append(dict(row))
+            with self._borrow_read_conn() as conn:
+                results = list(map(dict, conn.execute(SELECT_POSITIONS_SQL)))
 
-            self.logger.debug(f"Fetched {len(results)} positions (raw dict).")
+            self.logger.debug("Fetched %d positions (raw dict).", len(results))
             return results
 
         except Exception as e:
@@ -972,7 +1112,7 @@ class DataLocker:
             """, (new_size, position_id))
             conn.commit()
             conn.close()
-            self.logger.debug(f"Updated size of position {position_id} to {new_size}.")
+            self.logger.debug("Updated size of position %s to %s.", position_id, new_size)
 
         except sqlite3.Error as e:
             self.logger.error(f"Database error in update_position_size: {e}", exc_info=True)
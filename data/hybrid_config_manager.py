@@ -57,13 +57,17 @@ def load_json_config(json_path: str) -> Dict[str, Any]:
     """
     try:
         with open(json_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+            data = json.load(f)
     except FileNotFoundError:
         logger.warning(f"JSON config file '{json_path}' not found. Returning empty dict.")
         return {}
     except json.JSONDecodeError as e:
         logger.error(f"Error parsing JSON from '{json_path}': {e}")
         return {}
+    if not isinstance(data, dict):
+        logger.error(f"Error parsing JSON from '{json_path}': top level is {type(data).__name__}, not an object")
+        return {}
+    return data
 
 def load_config_hybrid(json_path: str, db_conn) -> Dict[str, Any]:
     """
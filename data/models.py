@@ -108,6 +108,8 @@ class CryptoWallet:
       - balance:        total balance in USD (or any currency you like)
     """
 
+    __slots__ = ("name", "public_address", "private_address", "image_path", "balance")
+
     def __init__(
             self,
             name: str,
@@ -132,6 +134,8 @@ class CryptoWallet:
         )
 
 class Broker:
+    __slots__ = ("name", "image_path", "web_address", "total_holding")
+
     def __init__(
         self,
         name: str,
@@ -109,7 +109,7 @@ class PriceMonitor:
             if sym.upper() in slug_map:
                 slugs.append(slug_map[sym.upper()])
             else:
-                logger.warning(f"No slug found for {sym}, skipping.")
+                logger.warning("No slug found for %s, skipping.", sym)
         if not slugs:
             return
 
@@ -142,7 +142,7 @@ class PriceMonitor:
             if sym.upper() in paprika_map:
                 ids.append(paprika_map[sym.upper()])
             else:
-                logger.warning(f"No paprika ID found for {sym}, skipping.")
+                logger.warning("No paprika ID found for %s, skipping.", sym)
         if not ids:
             return
 
@@ -189,7 +189,7 @@ class PriceMonitor:
         records = await fetch_historical_cmc(
             symbol, start_date, end_date, self.currency, self.cmc_api_key
         )
-        logger.debug(f"Fetched {len(records)} daily records for {symbol} from CMC.")
+        logger.debug("Fetched %d daily records for %s from CMC.", len(records), symbol)
 
         for r in records:
             self.data_locker.insert_historical_ohlc(
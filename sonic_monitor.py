@@ -92,7 +92,7 @@ class SonicMonitor:
 
     def set_initial_alerts(self):
         """Set all positions to known or triggered state on startup."""
-        positions = self.data_locker.read_positions()  # Assuming a method to get all positions
+        positions = self.data_locker.iter_positions()  # single pass, no list needed
         for position in positions:
             self.notified_positions.add(position['id'])
 
@@ -201,7 +201,7 @@ class SonicMonitor:
                 self.last_heat_report_time = now
 
             # Check risks and send alerts
-            self.risk_management_check(self.data_locker.read_positions())
+            self.risk_management_check(self.data_locker.iter_positions())
 
             #self.alert_manager.monitor_alerts()
 
@@ -145,14 +145,13 @@ def reset_api_counters_in_db():
 
 def load_app_config():
     """
-    Straightforward approach: load JSON from disk, parse into Pydantic model.
+    Load JSON from disk into the Pydantic model (cached by path + mtime).
+    A missing file gives the defaults; bad JSON or invalid data raises.
     """
     if not os.path.exists(CONFIG_PATH):
         # If no file, create an empty default or raise an error
         return AppConfig()  # or some default
-    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return AppConfig(**data)
+    return AppConfig.load(CONFIG_PATH)
 
 def save_app_config(config: AppConfig):
     """
@@ -238,8 +237,8 @@ def upload_positions():
                 pos_dict["wallet"] = pos_dict["wallet_name"]
                 # optional: del pos_dict["wallet_name"] if you don't want it lying around
 
-            # Create the position in DB
-            data_locker.create_position(pos_dict)
+        # Create the positions in DB, one transaction for the whole file
+        data_locker.create_positions(positions_list)
 
         return jsonify({"message": "Positions uploaded successfully"}), 200
 
@@ -587,17 +586,14 @@ def update_prices():
 @app.route("/alert-options", methods=["GET", "POST"])
 def alert_options():
     """
-    Example route that loads config from 'sonic_config.json' with standard JSON,
-    then constructs an AppConfig(...) object from it (Pydantic).
+    Example route that loads config from 'sonic_config.json' via AppConfig.load
+    (Pydantic model, cached by mtime). A missing or unparseable file is reported
+    by the handlers below rather than replaced with defaults.
     On POST, we parse form fields, update the config, and save back to JSON.
     """
     try:
-        # 1) Load JSON from disk
-        with open("sonic_config.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        # 2) Parse into Pydantic model
-        config_data = AppConfig(**data)
+        # 1) + 2) Load JSON from disk into the Pydantic model (raises on a bad file)
+        config_data = AppConfig.load("sonic_config.json")
 
         if request.method == "POST":
             # 3) Parse form fields, update the config